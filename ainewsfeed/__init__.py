@@ -1,5 +1,44 @@
-from .fetch import get_arxiv_papers
-from .filter_and_enrich import filter_and_enrich_papers_with_gemini, has_project_link
-from .social import find_tweets_for_paper
-from .report import generate_report
-from .assets import download_pdf, extract_figures, generate_pdf_preview
\ No newline at end of file
+import importlib
+
+# Public name -> submodule. Submodules are imported on first attribute access
+# (PEP 562), so e.g. `generate_feed.py --help` does not load genai or httpx.
+_EXPORTS = {
+    "get_arxiv_papers": "fetch",
+    "get_author_affiliations": "fetch",
+    "get_author_affiliations_batch": "fetch",
+    "get_author_affiliations_bulk": "fetch",
+    "filter_and_enrich_papers_with_gemini": "filter_and_enrich",
+    "filter_and_enrich_papers_with_gemini_async": "filter_and_enrich",
+    "extract_project_url": "urlutils",
+    "has_project_link": "urlutils",
+    "find_tweets_for_paper": "social",
+    "find_tweets_for_paper_async": "social_async",
+    "find_tweets_for_papers": "social_async",
+    "find_tweets_for_papers_async": "social_async",
+    "generate_report": "report",
+    "download_pdf": "assets",
+    "download_pdfs": "assets",
+    "download_pdfs_s3": "assets",
+    "extract_figures": "assets",
+    "extract_preview_and_figures": "assets",
+    "generate_pdf_preview": "assets",
+    "iter_pdf_assets": "assets",
+    "process_pdfs_batch": "assets",
+}
+
+# Submodules stay reachable as attributes, e.g. ainewsfeed.fetch.get_author_affiliations
+_SUBMODULES = frozenset(_EXPORTS.values()) | {"cache", "cli"}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+        globals()[name] = value  # Later lookups skip __getattr__
+        return value
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS) | _SUBMODULES)
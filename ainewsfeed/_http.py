@@ -0,0 +1,24 @@
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+def new_session(pool_size=32):
+    """
+    Creates a requests.Session with a pooled adapter that retries transient
+    failures (429/5xx) with backoff. Final error responses are still returned
+    so callers can inspect the status code.
+    """
+    retries = Retry(
+        total=3,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retries)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+# Shared by all modules so keep-alive connections and TLS sessions are reused
+SESSION = new_session()
@@ -1,105 +1,434 @@
+import multiprocessing
 import os
-import requests
-import fitz  # PyMuPDF
-import io
+import re
+import shutil
+import tarfile
 import time
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
 from pathlib import Path
-from PIL import Image
+from xml.etree import ElementTree
+from tqdm import tqdm
 
-def generate_pdf_preview(pdf_path, paper_id, output_dir):
+from ._http import SESSION, new_session
+
+# Render pools run next to download threads; forking a multi-threaded process can
+# deadlock the child, so workers come from a clean forkserver where available
+_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else None
+)
+
+def generate_pdf_preview(pdf_path, paper_id, output_dir, dpi=110):
     """
-    Renders the first page of the PDF as a PNG image.
+    Renders the first page of the PDF as a JPEG image.
+    Lower `dpi` trades preview sharpness for rendering speed.
     Returns the relative path to the image.
     """
-    try:
-        doc = fitz.open(pdf_path)
-        page = doc.load_page(0)  # First page
-        
-        # Render high-res image (zoom=2 for better quality)
-        pix = page.get_pixmap(matrix=fitz.Matrix(2, 2))
-        
-        preview_filename = f"{paper_id}_preview.png"
-        preview_path = Path(output_dir) / preview_filename
-        
-        pix.save(preview_path)
-        doc.close()
-        
-        return preview_filename
-    except Exception as e:
-        print(f"⚠️ Failed to generate preview for {paper_id}: {e}")
-        return None
+    preview_filename, _ = extract_preview_and_figures(
+        pdf_path, paper_id, output_dir, max_figures=0, dpi=dpi
+    )
+    return preview_filename
 
-def download_pdf(pdf_url, output_path):
-    """Downloads the PDF with a polite delay."""
+class _TokenBucket:
+    """Thread-safe token bucket allowing `rate` requests per second (may be below 1)."""
+
+    def __init__(self, rate):
+        if rate <= 0:
+            raise ValueError(f"rate must be positive, got {rate}")
+        self.rate = rate
+        # Room for at least one token, or rates below 1/s could never acquire
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.last = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+                self.last = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+def download_pdf(pdf_url, output_path, session=None, limiter=None, connections=4, chunk_size=4 * 1024 * 1024):
+    """
+    Downloads a single PDF, streaming the body straight to disk.
+    Large files (at least two `chunk_size` chunks) on servers that accept
+    byte ranges are fetched over up to `connections` parallel Range requests.
+    The body goes to a `.part` file that is only renamed into place once its
+    size matches Content-Length, so an existing `output_path` is always complete.
+    """
     if os.path.exists(output_path):
         return True
-        
+
+    part_path = f"{output_path}.part"
     try:
+        if limiter is not None:
+            limiter.acquire()
+        http = session or SESSION
         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
-        response = requests.get(pdf_url, headers=headers, timeout=15)
-        with open(output_path, 'wb') as f:
-            f.write(response.content)
-        time.sleep(1) # Polite delay
+        with http.get(pdf_url, headers=headers, timeout=30, stream=True) as response:
+            response.raise_for_status()
+            expected = int(response.headers.get("Content-Length", 0))
+            if response.headers.get("Content-Encoding"):
+                expected = 0  # Content-Length counts the encoded bytes
+            ranged = (
+                connections > 1
+                and expected >= 2 * chunk_size
+                and response.headers.get("Accept-Ranges") == "bytes"
+            )
+            if not ranged:
+                response.raw.decode_content = True
+                with open(part_path, 'wb') as f:
+                    shutil.copyfileobj(response.raw, f, 64 * 1024)
+
+        # Leaving the block above drops the unread single-stream body
+        if ranged:
+            _download_ranges(http, pdf_url, headers, part_path, expected, connections, chunk_size, limiter)
+
+        if expected and os.path.getsize(part_path) != expected:
+            os.remove(part_path)
+            print(f"⚠️ PDF Download truncated: {pdf_url}")
+            return False
+
+        os.replace(part_path, output_path)
         return True
     except Exception as e:
+        if os.path.exists(part_path):
+            os.remove(part_path)
         print(f"⚠️ PDF Download failed: {e}")
         return False
 
+def _download_ranges(http, pdf_url, headers, part_path, size, connections, chunk_size, limiter):
+    """
+    Fills a preallocated `part_path` with `chunk_size` byte ranges fetched in
+    parallel. Each range writes through its own file handle at its offset.
+    For very large bulk runs, a local caching DNS resolver (e.g. dnsmasq)
+    keeps name lookups off the critical path of these extra connections.
+    """
+    with open(part_path, 'wb') as f:
+        f.truncate(size)
+
+    def fetch(lo):
+        hi = min(lo + chunk_size, size) - 1
+        if limiter is not None:
+            limiter.acquire()
+        range_headers = {**headers, 'Range': f'bytes={lo}-{hi}'}
+        with http.get(pdf_url, headers=range_headers, timeout=30, stream=True) as response:
+            if response.status_code != 206:
+                raise IOError(f"Range request returned {response.status_code}")
+            content_range = response.headers.get("Content-Range", "")
+            if not content_range.startswith(f"bytes {lo}-{hi}/"):
+                raise IOError(f"Range request for {lo}-{hi} answered with '{content_range}'")
+            with open(part_path, 'r+b') as f:
+                f.seek(lo)
+                shutil.copyfileobj(response.raw, f, 64 * 1024)
+                written = f.tell() - lo
+            # The file is preallocated, so a short range would otherwise pass the size check
+            if written != hi - lo + 1:
+                raise IOError(f"Range {lo}-{hi} truncated after {written} bytes")
+
+    with ThreadPoolExecutor(max_workers=connections) as executor:
+        # list() re-raises the first failed range
+        list(executor.map(fetch, range(0, size, chunk_size)))
+
+def download_pdfs(jobs, max_workers=8, rps=4):
+    """
+    Downloads many PDFs concurrently.
+    `jobs` is a list of (pdf_url, output_path) tuples. Requests share one
+    connection pool and are rate limited to `rps` per second overall.
+    Returns a list of success flags in the same order as `jobs`.
+    """
+    session = new_session(pool_size=max_workers)
+    limiter = _TokenBucket(rps)
+
+    with session, ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(download_pdf, url, path, session, limiter)
+            for url, path in jobs
+        ]
+        for _ in tqdm(as_completed(futures), total=len(futures), desc="   Downloading PDFs"):
+            pass
+        return [f.result() for f in futures]
+
+def download_pdfs_s3(paper_ids, dst_dir):
+    """
+    Pulls PDFs from arXiv's requester-pays S3 bulk bucket (s3://arxiv/pdf/).
+    Only the monthly tarballs that can contain the requested IDs are streamed,
+    and only matching members are written to `dst_dir / f"{paper_id}.pdf"`.
+    Bulk tarballs lag behind the live site and hold one version per paper, so
+    callers should fall back to HTTPS for IDs missing from the result.
+    Requires boto3 and AWS credentials; transfer costs are billed to you.
+    Returns a dict {paper_id: path} of the PDFs that were extracted.
+    """
+    try:
+        import boto3
+        from botocore.config import Config
+    except ImportError:
+        print("⚠️ boto3 is not installed; skipping S3 bulk download.")
+        return {}
+
+    # Bulk members carry a version, e.g. 2310/2310.12345v1.pdf; look them up by bare ID
+    wanted = {}
+    for paper_id in paper_ids:
+        base_id = re.sub(r'v\d+$', '', paper_id)
+        if re.fullmatch(r'\d{4}\.\d{4,5}', base_id):  # New-style IDs only
+            wanted[base_id] = paper_id
+    if not wanted:
+        return {}
+
+    s3 = boto3.client('s3', config=Config(signature_version='s3v4'))
+    try:
+        manifest = s3.get_object(Bucket='arxiv', Key='pdf/arXiv_pdf_manifest.xml', RequestPayer='requester')
+        root = ElementTree.fromstring(manifest['Body'].read())
+    except Exception as e:
+        print(f"⚠️ Failed to read arXiv S3 manifest: {e}")
+        return {}
+
+    def number(arxiv_id):
+        return int(arxiv_id.split('.')[-1])
+
+    # Keep only the tarballs whose ID range covers one of the wanted IDs
+    tarballs = []
+    for entry in root.iter('file'):
+        yymm = entry.findtext('yymm')
+        first, last = entry.findtext('first_item'), entry.findtext('last_item')
+        if not (yymm and first and last):
+            continue
+        if any(
+            base_id[:4] == yymm and number(first) <= number(base_id) <= number(last)
+            for base_id in wanted
+        ):
+            tarballs.append(entry.findtext('filename'))
+
+    saved = {}
+    for key in tarballs:
+        print(f"   Streaming s3://arxiv/{key}...")
+        try:
+            body = s3.get_object(Bucket='arxiv', Key=key, RequestPayer='requester')['Body']
+            with tarfile.open(fileobj=body, mode='r|') as tar:
+                for member in tar:
+                    member_id = Path(member.name).stem
+                    base_id = re.sub(r'v\d+$', '', member_id)
+                    if base_id not in wanted or not member.isfile():
+                        continue
+                    paper_id = wanted[base_id]
+                    # A different version would be saved under the requested name and
+                    # shadow it; leave those papers to the HTTPS fallback instead
+                    if paper_id != base_id and member_id != paper_id:
+                        continue
+                    output_path = Path(dst_dir) / f"{paper_id}.pdf"
+                    part_path = f"{output_path}.part"
+                    with open(part_path, 'wb') as f:
+                        shutil.copyfileobj(tar.extractfile(member), f, 64 * 1024)
+                    os.replace(part_path, output_path)
+                    saved[paper_id] = output_path
+        except Exception as e:
+            print(f"⚠️ Failed to stream {key}: {e}")
+
+    return saved
+
 def extract_figures(pdf_path, paper_id, output_dir, max_figures=3):
     """
     Extracts the first N distinct images from the PDF.
     Returns a list of relative image paths.
     """
-    # Setup directories
-    figures_dir = Path(output_dir) / "figures"
-    figures_dir.mkdir(parents=True, exist_ok=True)
-    
-    doc = fitz.open(pdf_path)
+    _, saved_paths = extract_preview_and_figures(
+        pdf_path, paper_id, output_dir, max_figures=max_figures, preview=False
+    )
+    return saved_paths
+
+def extract_preview_and_figures(pdf_path, paper_id, output_dir, max_figures=3, preview=True, dpi=110):
+    """
+    Renders the first page as a preview and extracts the first N distinct
+    images, opening the PDF only once.
+    Returns a tuple (preview_filename, saved_paths).
+    """
+    preview_filename = None
     saved_paths = []
-    
-    # Iterate through first 5 pages only (figures usually appear early)
-    for page_index in range(min(5, len(doc))):
-        if len(saved_paths) >= max_figures:
-            break
-            
-        page = doc[page_index]
-        image_list = page.get_images(full=True)
-        
-        for img_index, img in enumerate(image_list):
-            if len(saved_paths) >= max_figures:
+
+    # Imported lazily so runs that never touch a PDF skip loading MuPDF
+    import fitz  # PyMuPDF
+
+    try:
+        doc = fitz.open(pdf_path)
+    except Exception as e:
+        print(f"⚠️ Failed to open PDF for {paper_id}: {e}")
+        return preview_filename, saved_paths
+
+    try:
+        figures_dir = Path(output_dir) / "figures"
+        if max_figures > 0:
+            figures_dir.mkdir(parents=True, exist_ok=True)
+
+        # Collect each distinct image xref once, in page order. Logos and
+        # reused figures repeat across pages but only need extracting once.
+        xref_order = []  # (page_index, img_index, xref)
+        seen = set()
+
+        # Iterate through first 5 pages only (figures usually appear early)
+        for page_index, page in _iter_pages(doc, 5):
+            if page_index == 0 and preview:
+                try:
+                    preview_filename = _render_preview(page, paper_id, output_dir, dpi)
+                except Exception as e:
+                    print(f"⚠️ Failed to generate preview for {paper_id}: {e}")
+
+            if max_figures <= 0:
                 break
-                
-            xref = img[0]
-            try:
-                base_image = doc.extract_image(xref)
-                image_bytes = base_image["image"]
-                
-                # --- Filter 1: Ignore small images (logos, icons) ---
-                if len(image_bytes) < 15000: # < 15KB
+            # get_image_info reports size and placement without decoding
+            for img_index, info in enumerate(page.get_image_info(xrefs=True)):
+                xref = info["xref"]
+                if xref == 0 or xref in seen:  # xref 0: inline image, cannot be extracted
                     continue
-                
-                # --- Filter 2: Ignore extreme aspect ratios (lines, dividers) ---
-                pil_img = Image.open(io.BytesIO(image_bytes))
-                w, h = pil_img.size
+                seen.add(xref)
+
+                # --- Filter 1: Ignore small images and extreme aspect ratios (icons, dividers) ---
+                w, h = info["width"], info["height"]
                 if w < 200 or h < 200: # Too small pixel-wise
                     continue
                 aspect = w / h
                 if aspect > 5 or aspect < 0.2: # Too skinny
                     continue
-                
-                # Save Image
-                filename = f"{paper_id}_p{page_index}_fig{img_index}.png"
-                filepath = figures_dir / filename
-                
-                # Convert CMYK to RGB if needed
-                if pil_img.mode == "CMYK":
-                    pil_img = pil_img.convert("RGB")
-                    
-                pil_img.save(filepath)
-                saved_paths.append(f"./figures/{filename}")
-                
-            except Exception:
+
+                xref_order.append((page_index, img_index, xref))
+
+        saved_paths = _save_figures(doc, xref_order, paper_id, figures_dir, max_figures)
+    finally:
+        doc.close()
+
+    return preview_filename, saved_paths
+
+def _iter_pages(doc, max_pages):
+    """Lazily yields (page_index, page) for the first `max_pages` pages."""
+    for page_index in range(min(max_pages, len(doc))):
+        yield page_index, doc.load_page(page_index)
+
+def _render_preview(page, paper_id, output_dir, dpi):
+    """Renders an already loaded page as the preview image."""
+    pix = page.get_pixmap(dpi=dpi)
+    
+    # JPEG encodes page renders much faster and smaller than PNG
+    preview_filename = f"{paper_id}_preview.jpg"
+    preview_path = Path(output_dir) / preview_filename
+    
+    with open(preview_path, "wb") as f:
+        f.write(pix.tobytes("jpeg", jpg_quality=75))
+    return preview_filename
+
+def _save_figures(doc, xref_order, paper_id, figures_dir, max_figures):
+    """Saves up to `max_figures` of the candidate images, reusing the open `doc`."""
+    saved_paths = []
+    
+    for page_index, img_index, xref in xref_order:
+        if len(saved_paths) >= max_figures:
+            break
+            
+        try:
+            base_image = doc.extract_image(xref)
+            image_bytes = base_image["image"]
+            
+            # --- Filter 2: Ignore small files (logos, icons) ---
+            if len(image_bytes) < 15000: # < 15KB
                 continue
+            
+            ext = base_image["ext"]
+            if ext in ("png", "jpeg") and base_image.get("colorspace") != 4:
+                # Browser-friendly stream; save it as-is
+                filename = f"{paper_id}_p{page_index}_fig{img_index}.{ext}"
+                (figures_dir / filename).write_bytes(image_bytes)
+            else:
+                # CMYK, JPEG 2000, JBIG2, TIFF, ... do not display in Markdown
+                # previews; re-encode as RGB PNG (skipped if PIL cannot read it)
+                import io
+                from PIL import Image
+
+                filename = f"{paper_id}_p{page_index}_fig{img_index}.png"
+                pil_img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
+                pil_img.save(figures_dir / filename)
                 
-    doc.close()
-    return saved_paths
\ No newline at end of file
+            saved_paths.append(f"./figures/{filename}")
+            
+        except Exception:
+            continue
+            
+    return saved_paths
+
+def _process_one_pdf(pdf_path, paper_id, output_dir, max_figures, dpi):
+    """
+    Worker for process_pdfs_batch. Runs in a child process and returns only
+    picklable values: (preview_filename, figure_paths).
+    """
+    return extract_preview_and_figures(pdf_path, paper_id, output_dir, max_figures=max_figures, dpi=dpi)
+
+def process_pdfs_batch(jobs, output_dir, max_figures=3, max_workers=None, dpi=110):
+    """
+    Renders previews and extracts figures for many PDFs in parallel processes.
+    `jobs` is a list of (pdf_path, paper_id) tuples.
+    Returns a list of (preview_filename, figure_paths) in the same order as `jobs`.
+    """
+    if not jobs:
+        return []
+    if max_workers is None:
+        max_workers = min(os.cpu_count() or 1, 6)
+
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=_MP_CONTEXT) as executor:
+        futures = [
+            executor.submit(_process_one_pdf, str(pdf_path), paper_id, str(output_dir), max_figures, dpi)
+            for pdf_path, paper_id in jobs
+        ]
+        return [f.result() for f in futures]
+
+def iter_pdf_assets(jobs, output_dir, max_workers=8, rps=4, max_figures=3, dpi=110, process_workers=None):
+    """
+    Two-stage pipeline: PDFs are downloaded on a thread pool (I/O) and each one
+    is handed to a process pool for rendering (CPU) as soon as it lands, so
+    downloads and rendering overlap instead of running back to back.
+    `jobs` is a list of (pdf_url, output_path, paper_id) tuples.
+    Yields (index, success, preview_filename, figure_paths) in completion order.
+    `success` refers to the download; preview_filename is None if rendering failed.
+    """
+    if not jobs:
+        return
+    if process_workers is None:
+        process_workers = min(os.cpu_count() or 1, 6)
+
+    session = new_session(pool_size=max_workers)
+    limiter = _TokenBucket(rps)
+
+    with session, \
+            ThreadPoolExecutor(max_workers=max_workers) as downloads, \
+            ProcessPoolExecutor(max_workers=process_workers, mp_context=_MP_CONTEXT) as renders, \
+            tqdm(total=len(jobs), desc="   Fetching PDFs") as progress:
+        # Maps each in-flight future to (stage, job index)
+        pending = {
+            downloads.submit(download_pdf, url, path, session, limiter): ("download", i)
+            for i, (url, path, _) in enumerate(jobs)
+        }
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, i = pending.pop(future)
+                if stage == "download":
+                    if future.result():
+                        _, path, paper_id = jobs[i]
+                        render = renders.submit(
+                            _process_one_pdf, str(path), paper_id, str(output_dir), max_figures, dpi
+                        )
+                        pending[render] = ("render", i)
+                        continue
+                    progress.update()
+                    yield i, False, None, []
+                else:
+                    try:
+                        preview_filename, figure_paths = future.result()
+                    except Exception as e:
+                        print(f"⚠️ Failed to process PDF for {jobs[i][2]}: {e}")
+                        preview_filename, figure_paths = None, []
+                    progress.update()
+                    yield i, True, preview_filename, figure_paths
+
@@ -0,0 +1,106 @@
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sqlite3
+import time
+from contextlib import closing
+from pathlib import Path
+
+# Override with the AINEWSFEED_CACHE env var (e.g. to share the cache in CI)
+CACHE_PATH = Path(os.getenv("AINEWSFEED_CACHE", Path.home() / ".cache" / "ainewsfeed" / "cache.sqlite"))
+
+# When set, every read misses while writes still happen, so cached entries get refreshed
+_refresh = False
+
+def set_refresh(enabled=True):
+    """Bypasses cache reads (e.g. for --force); fresh results still overwrite the stored ones."""
+    global _refresh
+    _refresh = enabled
+
+def _connect(path=None):
+    path = Path(path or CACHE_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    # WAL lets readers proceed while another thread or run is writing
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS cache ("
+        "namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, expires_at REAL, "
+        "PRIMARY KEY (namespace, key))"
+    )
+    return conn
+
+def get_many(namespace, keys, path=None):
+    """
+    Looks up several keys at once.
+    Returns a dict {key: value} containing only the unexpired hits
+    (always empty while refreshing, see set_refresh).
+    """
+    keys = list(keys)
+    hits = {}
+    if _refresh:
+        return hits
+    now = time.time()
+    with closing(_connect(path)) as conn:
+        # Stay well below SQLite's bound-parameter limit
+        for i in range(0, len(keys), 500):
+            chunk = keys[i:i + 500]
+            rows = conn.execute(
+                f"SELECT key, value FROM cache WHERE namespace = ? AND key IN ({', '.join('?' * len(chunk))}) "
+                "AND (expires_at IS NULL OR expires_at > ?)",
+                (namespace, *chunk, now)
+            )
+            for key, value in rows:
+                hits[key] = pickle.loads(value)
+    return hits
+
+def set_many(namespace, items, ttl=None, path=None):
+    """
+    Stores (key, value) pairs in one transaction.
+    `ttl` is in seconds; None means the entries never expire.
+    """
+    expires_at = None if ttl is None else time.time() + ttl
+    rows = [(namespace, key, pickle.dumps(value), expires_at) for key, value in items]
+    with closing(_connect(path)) as conn, conn:
+        conn.executemany("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)", rows)
+
+def cached(namespace, ttl=None, key=None, skip=None):
+    """
+    Decorator persisting a function's results across runs.
+    By default the cache key is a hash of all (bound) arguments; pass `key`
+    to derive it from the arguments yourself. `None` results are not cached,
+    so failed lookups are retried on the next run; neither are results for
+    which `skip(value)` is true.
+    """
+    def decorator(fn):
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if key is not None:
+                cache_key = str(key(*args, **kwargs))
+            else:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                cache_key = hashlib.sha256(repr(sorted(bound.arguments.items())).encode()).hexdigest()
+
+            try:
+                hits = get_many(namespace, [cache_key])
+            except sqlite3.Error as e:
+                print(f"⚠️ Cache read failed ({namespace}): {e}")
+                hits = {}
+            if cache_key in hits:
+                return hits[cache_key]
+
+            value = fn(*args, **kwargs)
+            if value is not None and not (skip and skip(value)):
+                try:
+                    set_many(namespace, [(cache_key, value)], ttl=ttl)
+                except sqlite3.Error as e:
+                    print(f"⚠️ Cache write failed ({namespace}): {e}")
+            return value
+
+        return wrapper
+    return decorator
@@ -0,0 +1,64 @@
+import os
+import sys
+import copy
+import yaml
+import datetime
+import functools
+from pathlib import Path
+from dotenv import load_dotenv
+
+try:
+    # libyaml-backed parser, much faster than the pure-Python one
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+def load_config(config_path):
+    """Loads YAML config and overrides with Env Vars."""
+    if not os.path.exists(config_path):
+        print(f"❌ Config file not found: {config_path}")
+        sys.exit(1)
+
+    # Copy, since the parsed config is cached and mutated below
+    config = copy.deepcopy(_parse_config(config_path, os.path.getmtime(config_path)))
+
+    load_dotenv()
+    
+    # Priority: Env Var > YAML
+    config["keys"] = {}
+    config['keys']['gemini'] = os.getenv("GEMINI_API_KEY") or config['keys'].get('gemini')
+    config['keys']['x_bearer'] = os.getenv("X_BEARER_TOKEN") or config['keys'].get('x_bearer')
+
+    if not config['keys']['gemini']:
+        print("❌ Error: Gemini API Key is missing.")
+        sys.exit(1)
+        
+    return config
+
+@functools.lru_cache(maxsize=1)
+def _parse_config(config_path, mtime):
+    """Parses the YAML file; `mtime` is part of the cache key so edits are picked up."""
+    with open(config_path, "r") as f:
+        return yaml.load(f, Loader=SafeLoader)
+
+def setup_directories(root_dir, filename_prefix, date=None):
+    """
+    Sets up the directory structure and returns paths.
+    """
+    now = datetime.datetime.now() if date is None else date
+    year, week, date_str = now.strftime("%Y|%V|%Y_%m_%d").split("|")
+    
+    # 1. Base Week Directory
+    week_dir = Path(root_dir) / year / f"week_{week}"
+    
+    # 2. Assets Directory (creating it also creates the week directory)
+    assets_folder_name = f"{filename_prefix}_{date_str}"
+    assets_dir = week_dir / "assets" / assets_folder_name
+    assets_dir.mkdir(parents=True, exist_ok=True)
+    
+    # 3. File Paths
+    report_file = week_dir / f"{filename_prefix}_{date_str}.md"
+    data_file = assets_dir / "papers_data.json"  # <-- Cache File
+    relative_asset_path = f"./assets/{assets_folder_name}"
+
+    return report_file, assets_dir, data_file, relative_asset_path
@@ -1,8 +1,43 @@
-import arxiv
+import asyncio
+import datetime
+import html
+import re
+import sqlite3
+import time
+import feedparser
+import httpx
+import orjson
 
-def get_arxiv_papers(start_date, end_date, max_results=200, categories=['cs.CV', 'cs.RO']):
+from ._http import SESSION
+from .cache import cached, get_many, set_many
+
+# User-Agent is required to avoid 403 Forbidden on arxiv.org
+_USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'
+
+# The authors block on an arXiv abstract page, and any tags inside it
+_AUTHORS_RE = re.compile(rb'<div class="authors">(.*?)</div>', re.DOTALL)
+_TAG_RE = re.compile(r'<[^>]+>')
+
+# Semantic Scholar accepts up to 500 IDs per batch request
+_S2_BATCH_URL = "https://api.semanticscholar.org/graph/v1/paper/batch"
+_S2_BATCH_SIZE = 500
+# Unauthenticated clients get 429s; the shared session's Retry does not cover POST
+_S2_RETRIES = 3
+_VERSION_RE = re.compile(r'v\d+$')
+
+# arXiv's query API; pages are fetched concurrently, up to max_concurrency at a time
+_ARXIV_API_URL = "https://export.arxiv.org/api/query"
+_ARXIV_PAGE_SIZE = 200
+_ARXIV_PAGE_RETRIES = 3
+_ARXIV_RETRY_STATUSES = frozenset((429, 500, 502, 503, 504))
+
+# An empty result is more likely a transient API hiccup than a quiet day; don't pin it for 24h
+@cached("arxiv_papers", ttl=24 * 60 * 60, skip=lambda papers: not papers)
+def get_arxiv_papers(start_date, end_date, max_results=200, categories=['cs.CV', 'cs.RO'], max_concurrency=4):
     """
     Fetches papers from arXiv for the last N days in specific categories.
+    Result pages are requested in parallel (at most `max_concurrency` at once)
+    instead of one after another with a delay in between.
     """
     
     # Construct query: cat:cs.CV OR cat:cs.RO ...
@@ -10,58 +45,203 @@ def get_arxiv_papers(start_date, end_date, max_results=200, categories=['cs.CV',
     query = f"({query}) AND submittedDate:[{start_date.strftime('%Y%m%d%H%M')} TO {end_date.strftime('%Y%m%d%H%M')}]"
 
     print(f"🔍 Querying arXiv with (max {max_results}):\n{query}")
-    
-    search = arxiv.Search(
-        query=query,
-        max_results=max_results,
-        sort_by=arxiv.SortCriterion.SubmittedDate
-    )
 
     papers = []
-    client = arxiv.Client()
-    
-    for result in client.results(search):
-        # Filter by date (API sort is approximate)
-        if result.published >= start_date and result.published <= end_date:
+    for entry in asyncio.run(_fetch_arxiv_entries(query, max_results, max_concurrency)):
+        published = datetime.datetime.fromisoformat(entry.published)
+
+        # Filter by date (the query bound is on submission time)
+        if start_date <= published <= end_date:
             papers.append({
-                "id": result.entry_id.split('/')[-1],
-                "title": result.title.replace('\n', ' '),
-                "abstract": result.summary.replace('\n', ' '),
-                "comment": result.comment or "",
-                "authors_simple": [a.name for a in result.authors],
-                "url": result.entry_id,
-                "published": result.published.strftime("%Y-%m-%d")
+                "id": entry.id.split('/')[-1],
+                "title": re.sub(r'\s+', ' ', entry.title),
+                "abstract": entry.summary.replace('\n', ' '),
+                "comment": entry.get("arxiv_comment") or "",
+                "authors_simple": [a.name for a in entry.get("authors", [])],
+                "url": entry.id,
+                "published": published.strftime("%Y-%m-%d")
             })
                 
     print(f"✅ Fetched {len(papers)} raw papers from arXiv.")
     return papers
 
-def get_author_affiliations(paper_id):
+async def _fetch_arxiv_entries(query, max_results, max_concurrency):
+    """Fetches the first page to learn the result count, then the rest in parallel."""
+    semaphore = asyncio.Semaphore(max_concurrency)
+    headers = {'User-Agent': _USER_AGENT}
+    async with httpx.AsyncClient(headers=headers, timeout=60) as client:
+        first = await _fetch_arxiv_page(client, semaphore, query, 0, min(_ARXIV_PAGE_SIZE, max_results))
+        total = min(int(first.feed.get("opensearch_totalresults", 0)), max_results)
+
+        pages = await asyncio.gather(*(
+            _fetch_arxiv_page(client, semaphore, query, start, min(_ARXIV_PAGE_SIZE, total - start), total)
+            for start in range(_ARXIV_PAGE_SIZE, total, _ARXIV_PAGE_SIZE)
+        ))
+
+    # gather keeps page order, so entries stay newest first
+    return [entry for page in (first, *pages) for entry in page.entries]
+
+async def _fetch_arxiv_page(client, semaphore, query, start, size, total=None):
+    """
+    Fetches one result page. `total` is the result count reported by the first
+    page; an empty page before it is a flaky reply and is retried.
+    """
+    params = {
+        "search_query": query,
+        "start": start,
+        "max_results": size,
+        "sortBy": "submittedDate",
+        "sortOrder": "descending"
+    }
+    error = None
+    for attempt in range(_ARXIV_PAGE_RETRIES):
+        if attempt:
+            await asyncio.sleep(3 * 2 ** (attempt - 1))  # Back off 3s, 6s, ...
+        try:
+            async with semaphore:
+                response = await client.get(_ARXIV_API_URL, params=params)
+            response.raise_for_status()
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code not in _ARXIV_RETRY_STATUSES:
+                raise
+            error = e
+            continue
+        except httpx.TransportError as e:
+            error = e
+            continue
+
+        # Parse off the event loop; feedparser is pure Python
+        feed = await asyncio.get_running_loop().run_in_executor(None, feedparser.parse, response.content)
+
+        # arXiv occasionally returns an empty page mid-result set, usually one that
+        # also claims totalResults=0, so judge it against the first page's count
+        if total is None:
+            total = int(feed.feed.get("opensearch_totalresults", 0))
+        if feed.entries or start >= total:
+            return feed
+        error = "empty page"
+
+    # Fail rather than return (and cache) a partial result set
+    raise RuntimeError(f"arXiv page at offset {start} failed after {_ARXIV_PAGE_RETRIES} attempts: {error}")
+
+@cached("affiliations", key=lambda paper_id, session=None: paper_id)
+def get_author_affiliations(paper_id, session=None):
     """
     Scrapes the arXiv abstract page to get the full author string with affiliations.
     Example return: "Kaiming He (Meta AI), Ross Girshick (Meta AI)"
+    `session` defaults to the shared keep-alive session.
     """
-    import requests
-    from bs4 import BeautifulSoup
-    
     url = f"https://arxiv.org/abs/{paper_id}"
     try:
-        # User-Agent is required to avoid 403 Forbidden
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'}
-        response = requests.get(url, headers=headers, timeout=5)
+        headers = {'User-Agent': _USER_AGENT}
+        response = (session or SESSION).get(url, headers=headers, timeout=5)
         
         if response.status_code != 200:
             return None
             
-        soup = BeautifulSoup(response.content, 'html.parser')
-        authors_div = soup.find('div', class_='authors')
-        
-        if not authors_div:
-            return None
-            
-        # The div text is usually "Authors: Name (Affil), Name (Affil)"
-        full_text = authors_div.get_text()
-        return full_text.replace("Authors:", "").strip()
+        return _parse_affiliations(response.content)
         
     except Exception as e:
-        return None
\ No newline at end of file
+        return None
+
+def get_author_affiliations_bulk(paper_ids, concurrency=4):
+    """
+    Fetches affiliations for many papers at once.
+    Cached entries are reused; the rest are scraped concurrently over one
+    HTTP/2 connection, at most `concurrency` at a time to stay polite.
+    Returns a dict {paper_id: author string or None}.
+    """
+    try:
+        results = get_many("affiliations", paper_ids)
+    except sqlite3.Error as e:
+        print(f"⚠️ Cache read failed (affiliations): {e}")
+        results = {}
+
+    missing = [pid for pid in paper_ids if pid not in results]
+    if missing:
+        fetched = dict(asyncio.run(_gather_affiliations(missing, concurrency)))
+        try:
+            set_many("affiliations", [(pid, text) for pid, text in fetched.items() if text])
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache write failed (affiliations): {e}")
+        results.update(fetched)
+
+    return results
+
+def get_author_affiliations_batch(paper_ids, session=None):
+    """
+    Looks up affiliations for many papers via the Semantic Scholar batch API,
+    one POST per 500 IDs instead of one request per paper.
+    Returns a dict {paper_id: "Name (Affil), Name (Affil)"} containing only the
+    papers for which Semantic Scholar knows at least one affiliation.
+    """
+    results = {}
+    for i in range(0, len(paper_ids), _S2_BATCH_SIZE):
+        chunk = paper_ids[i:i + _S2_BATCH_SIZE]
+        try:
+            for attempt in range(_S2_RETRIES + 1):
+                response = (session or SESSION).post(
+                    _S2_BATCH_URL,
+                    params={'fields': 'authors.name,authors.affiliations'},
+                    json={"ids": [f"arXiv:{_VERSION_RE.sub('', pid)}" for pid in chunk]},
+                    timeout=30
+                )
+                if response.status_code != 429 or attempt == _S2_RETRIES:
+                    break
+                time.sleep(_retry_after(response, default=2 ** attempt))
+            if response.status_code != 200:
+                print(f"⚠️ Semantic Scholar Error ({response.status_code}): {response.text[:200]}")
+                continue
+            records = orjson.loads(response.content)
+        except Exception as e:
+            print(f"⚠️ Semantic Scholar request failed: {e}")
+            continue
+
+        # The response is aligned with the request, with null for unknown IDs
+        for paper_id, record in zip(chunk, records):
+            authors = (record or {}).get("authors") or []
+            if not any(a.get("affiliations") for a in authors):
+                continue
+            results[paper_id] = ", ".join(
+                f"{a['name']} ({', '.join(a['affiliations'])})" if a.get("affiliations") else a['name']
+                for a in authors
+            )
+    return results
+
+def _retry_after(response, default):
+    """Seconds to wait before retrying, from a numeric Retry-After header (capped at 60s)."""
+    try:
+        return min(float(response.headers.get("Retry-After", default)), 60.0)
+    except ValueError:  # HTTP-date form
+        return default
+
+async def _gather_affiliations(paper_ids, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    headers = {'User-Agent': _USER_AGENT}
+    async with httpx.AsyncClient(base_url="https://arxiv.org", http2=True, headers=headers, timeout=10) as client:
+        return await asyncio.gather(*(
+            _fetch_affiliations(client, paper_id, semaphore) for paper_id in paper_ids
+        ))
+
+async def _fetch_affiliations(client, paper_id, semaphore):
+    """Returns (paper_id, author string or None)."""
+    async with semaphore:
+        try:
+            response = await client.get(f"/abs/{paper_id}")
+        except Exception:
+            return paper_id, None
+
+    if response.status_code != 200:
+        return paper_id, None
+    return paper_id, _parse_affiliations(response.content)
+
+def _parse_affiliations(page):
+    """Extracts the author string from the raw bytes of an arXiv abstract page."""
+    match = _AUTHORS_RE.search(page)
+    if not match:
+        return None
+
+    # The div text is usually "Authors: Name (Affil), Name (Affil)"
+    full_text = html.unescape(_TAG_RE.sub("", match.group(1).decode("utf-8", errors="replace")))
+    full_text = " ".join(full_text.split())
+    return full_text.replace("Authors:", "").strip()
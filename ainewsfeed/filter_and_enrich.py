@@ -1,78 +1,148 @@
-import json
-import re
+import asyncio
+import hashlib
+import sqlite3
+import orjson
 from google import genai
 from google.genai import types
+from pydantic import BaseModel
+
+from .cache import get_many, set_many
+from .urlutils import extract_project_url, has_project_link
 
 MODEL = 'gemini-3-flash-preview'  # Use the latest flash model for best performance
 
-def extract_project_url(text):
-    """
-    Finds the first valid external project URL (Web Demos, YouTube).
-    Ignores:
-      - ArXiv / DOI / Academic links
-      - github.com (Repositories do not iframe well)
-    Keeps:
-      - github.io (Project Pages)
-      - huggingface.co (Spaces)
-      - Custom domains
-    """
-    if not text: return None
-    
-    # Regex to capture http/https URLs
-    url_pattern = r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+[/\w\.-]*(?<!\.)'
-    urls = re.findall(url_pattern, text)
-    
-    for url in urls:
-        lower_url = url.lower()
-        
-        # 1. Exclude academic/meta links
-        if any(x in lower_url for x in ["arxiv.org", "doi.org", "creativecommons.org", "license", "overleaf.com"]):
-            continue
-            
-        # 2. Exclude raw GitHub repositories (they block iframes)
-        # But keep *.github.io (Project Pages)
-        if "github.com" in lower_url:
-            continue
-            
-        # 3. Handle Video Embeds (YouTube)
-        if "youtube.com/watch" in url:
-            video_id = url.split("v=")[-1].split("&")[0]
-            return f"https://www.youtube.com/embed/{video_id}"
-        if "youtu.be" in url:
-            video_id = url.split("/")[-1]
-            return f"https://www.youtube.com/embed/{video_id}"
-            
-        return url # Return the first valid one found
-        
-    return None
+class EnrichedPaper(BaseModel):
+    """One selected paper as returned by Gemini (enforced via response_schema)."""
+    id: str
+    star_rating: str
+    summary: str
 
-def has_project_link(paper):
+def filter_and_enrich_papers_with_gemini(papers, user_interests, api_key, limit=20, concurrency=8, shard_size=None, cache_path=None):
     """
-    Returns True if the paper has a project link in Abstract OR Comments.
+    Filters, sorts, summarizes, and rates papers with Gemini, one prompt per shard.
+    Without `shard_size` all papers go into a single call and keep Gemini's order;
+    with it, shards of `shard_size` papers are ranked by concurrent calls (at most
+    `concurrency` at once) and merged by star rating, then rank within the shard.
+    Returns the top `limit` papers, sorted by relevance, with enriched metadata.
+    See filter_and_enrich_papers_with_gemini_async for `cache_path`.
     """
-    # Check Abstract
-    if extract_project_url(paper.get('abstract', '')):
-        return True
-    # Check Comment (e.g. "Code at https://github...")
-    if extract_project_url(paper.get('comment', '')):
-        return True
-    return False
-
-def filter_and_enrich_papers_with_gemini(papers, user_interests, api_key, limit=20):
+    return asyncio.run(filter_and_enrich_papers_with_gemini_async(
+        papers, user_interests, api_key,
+        limit=limit, concurrency=concurrency, shard_size=shard_size, cache_path=cache_path
+    ))
+
+async def filter_and_enrich_papers_with_gemini_async(papers, user_interests, api_key, limit=20, concurrency=8, shard_size=None, cache_path=None):
     """
-    Merges filtering, sorting, summarization, and rating into a single Gemini call.
-    Returns the top `limit` papers, sorted by relevance, with enriched metadata.
+    Async variant of filter_and_enrich_papers_with_gemini using Gemini's
+    async client. With `shard_size`, the papers are split into shards that are
+    ranked by concurrent Gemini calls (at most `concurrency` in flight) and
+    then merged by star rating.
+    With `cache_path`, each paper's outcome (selected with rating/summary, or
+    rejected) is stored per (paper, interests) so later runs only send new
+    papers to Gemini. Changing the interests, `limit` or `shard_size`
+    invalidates the cache, since they decide which papers get rejected.
     """
-    print(f"✨ Processing {len(papers)} papers with Gemini...")
+    settings_hash = _settings_hash(user_interests, limit, shard_size)
+    keys = {p['id']: _cache_key(p['id'], settings_hash) for p in papers}
+    cached_outcomes = {}
+    if cache_path is not None:
+        try:
+            cached_outcomes = get_many("gemini", keys.values(), path=cache_path)
+        except sqlite3.Error as e:
+            print(f"⚠️ Cache read failed (gemini): {e}")
+
+    # Cached selections are regrouped into the shards they were ranked in,
+    # in Gemini's original order, so the merge sees the same rankings again
+    cached_shards = {}
+    for p in papers:  # Paper order keeps the shards in their original order too
+        outcome = cached_outcomes.get(keys[p['id']])
+        if outcome:
+            cached_shards.setdefault(outcome.get('shard'), []).append(outcome)
+    cached_ranked = [
+        [EnrichedPaper.model_validate(o) for o in sorted(shard, key=lambda o: o.get('rank', 0))]
+        for shard in cached_shards.values()
+    ]
+    misses = [p for p in papers if keys[p['id']] not in cached_outcomes]
+    if cached_outcomes:
+        print(f"⚡ {len(papers) - len(misses)} papers answered from the Gemini cache.")
+
+    if misses:
+        print(f"✨ Processing {len(misses)} papers with Gemini...")
     client = genai.Client(api_key=api_key)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    shard_size = shard_size or len(misses) or 1
+    shards = [misses[i:i + shard_size] for i in range(0, len(misses), shard_size)]
+    prompts = [_build_prompt(shard, user_interests, limit) for shard in shards]
+    prompt = "\n\n".join(prompts)
+
+    try:
+        shard_results = await asyncio.gather(
+            *(_generate(client, semaphore, p) for p in prompts),
+            return_exceptions=True
+        )
+        outcomes = []
+        ranked = []
+        for shard, results in zip(shards, shard_results):
+            if isinstance(results, Exception):
+                print(f"⚠️ Gemini shard failed: {results}")
+                continue
+            ranked.append(results)
+            shard_id = _shard_id(shard)
+            selected = {}
+            for rank, item in enumerate(results):
+                # Keep the first occurrence, as _apply_results does
+                selected.setdefault(item.id, {**item.model_dump(), "shard": shard_id, "rank": rank})
+            outcomes.extend((keys[p['id']], selected.get(p['id'], False)) for p in shard)
+        ranked.extend(cached_ranked)
+        if not ranked and not cached_outcomes:
+            raise RuntimeError("All Gemini requests failed.")
+
+        if cache_path is not None and outcomes:
+            try:
+                set_many("gemini", outcomes, path=cache_path)
+            except sqlite3.Error as e:
+                print(f"⚠️ Cache write failed (gemini): {e}")
+
+        final_papers = _apply_results(papers, _merge_shards(ranked)) if ranked else []
+
+        return {
+            "papers": final_papers[:limit],  # Enforce limit
+            "prompt": prompt
+        }
+
+    except Exception as e:
+        print(f"❌ Processing Error: {e}")
+        # Fallback: Return first few original papers without enrichment
+        return {
+            "papers": papers[:limit],
+            "prompt": prompt
+        }
+
+def _settings_hash(user_interests, limit, shard_size):
+    """Fingerprint of the interests, selection settings and model the cached outcomes depend on."""
+    payload = orjson.dumps(
+        {"interests": user_interests, "limit": limit, "shard_size": shard_size, "model": MODEL},
+        option=orjson.OPT_SORT_KEYS
+    )
+    return hashlib.blake2b(payload).hexdigest()
+
+def _cache_key(paper_id, settings_hash):
+    return hashlib.blake2b(f"{paper_id}|{settings_hash}".encode()).hexdigest()
 
+def _shard_id(shard):
+    """Stable id of a shard, so cached selections can be regrouped by the ranking they came from."""
+    return hashlib.blake2b("|".join(p['id'] for p in shard).encode(), digest_size=8).hexdigest()
+
+def _build_prompt(papers, user_interests, limit):
+    """Builds the combined filter + enrich prompt for a list of papers."""
     # Prepare the context. 
     # Note: We include the Abstract to ensure the summary and rating are accurate.
     # If the list is massive (e.g., 100+), consider truncating abstracts or doing a two-step pass.
-    papers_text = "\n\n".join([
+    papers_text = "\n\n".join(
         f"ID: {p['id']}\nTitle: {p['title']}\nAbstract: {p['abstract']}" 
         for p in papers
-    ])
+    )
 
     prompt = f"""
     You are an expert research assistant.
@@ -103,56 +173,66 @@ def filter_and_enrich_papers_with_gemini(papers, user_interests, api_key, limit=
     Papers to analyze:
     {papers_text}
     """
+    return prompt
 
-    try:
-        response = client.models.generate_content(
+async def _generate(client, semaphore, prompt):
+    """Sends one prompt to Gemini and returns the validated list of EnrichedPaper."""
+    async with semaphore:
+        response = await client.aio.models.generate_content(
             model=MODEL,
             contents=prompt,
             config=types.GenerateContentConfig(
                 response_mime_type="application/json",
+                response_schema=list[EnrichedPaper],
                 temperature=0.3 # Lower temperature for better sorting/formatting adherence
             )
         )
 
-        # 1. Parse the JSON response
-        results = json.loads(response.text)
-
-        # 2. Create a lookup dictionary for O(1) access
-        #    Map ID -> {summary, rating, sort_index}
-        enrichment_map = {item['id']: item for item in results}
-
-        # 3. Filter and Enrich the original papers
-        final_papers = []
-        for p in papers:
-            if p['id'] in enrichment_map:
-                data = enrichment_map[p['id']]
-                
-                # Enrich original object
-                p['ai_summary'] = data.get('summary', 'No summary available.')
-                p['star_rating'] = data.get('star_rating', '☆☆☆☆☆')
-                
-                # Extract project URL locally (preserving your original logic)
-                url = extract_project_url(p.get('abstract', ''))
-                if not url:
-                    url = extract_project_url(p.get('comment', ''))
-                p['project_url'] = url
-                
-                final_papers.append(p)
-
-        # 4. Sort the final list based on the order returned by Gemini
-        #    We create a map of ID to Index from the JSON response
-        sort_order = {item['id']: index for index, item in enumerate(results)}
-        final_papers.sort(key=lambda x: sort_order.get(x['id'], 999))
+    # Parse and validate the JSON response
+    return [EnrichedPaper.model_validate(x) for x in orjson.loads(response.text)]
 
-        return {
-            "papers": final_papers[:limit],  # Enforce limit after sorting
-            "prompt": prompt
-        }
+def _merge_shards(shard_results):
+    """
+    Combines per-shard rankings into one list. A single shard keeps Gemini's
+    order; several are re-ranked by star count, then by rank within the shard.
+    """
+    if len(shard_results) == 1:
+        return list(shard_results[0])
 
-    except Exception as e:
-        print(f"❌ Processing Error: {e}")
-        # Fallback: Return first few original papers without enrichment
-        return {
-            "papers": papers[:limit],
-            "prompt": prompt
-        }
\ No newline at end of file
+    ranked = [
+        (-item.star_rating.count('★'), rank, item)
+        for results in shard_results
+        for rank, item in enumerate(results)
+    ]
+    ranked.sort(key=lambda x: x[:2])
+    return [item for _, _, item in ranked]
+
+def _apply_results(papers, results):
+    """
+    Enriches the papers Gemini selected and returns them in Gemini's order.
+    """
+    # 1. Create a lookup dictionary for O(1) access
+    #    Map ID -> original paper
+    by_id = {p['id']: p for p in papers}
+
+    # 2. Filter and Enrich the original papers.
+    #    Iterating the response keeps Gemini's relevance order; popping
+    #    drops unknown IDs and any duplicates Gemini may return.
+    final_papers = []
+    for item in results:
+        p = by_id.pop(item.id, None)
+        if p is None:
+            continue
+            
+        # Enrich original object
+        p['ai_summary'] = item.summary or 'No summary available.'
+        p['star_rating'] = item.star_rating or '☆☆☆☆☆'
+        
+        # Extract project URL locally (preserving your original logic)
+        url = extract_project_url(p.get('abstract', ''))
+        if not url:
+            url = extract_project_url(p.get('comment', ''))
+        p['project_url'] = url
+        
+        final_papers.append(p)
+    return final_papers
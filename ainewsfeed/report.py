@@ -1,4 +1,4 @@
-from jinja2 import Template
+from jinja2 import Environment
 import datetime
 from pathlib import Path
 
@@ -61,18 +61,21 @@ TEMPLATE = """
 {% endfor %}
 """
 
+# Parse and compile the template once at import time
+_ENV = Environment(trim_blocks=True, lstrip_blocks=True, autoescape=False)
+_TEMPLATE = _ENV.from_string(TEMPLATE)
+
 def generate_report(papers, output_path, date=None):
     """
     Generates a Markdown report and saves it to the specified path.
     Creates parent directories if they don't exist.
     """
-    # 1. Prepare Template
-    template = Template(TEMPLATE)
+    # 1. Render Template
     if date is None:
         date = datetime.datetime.now()
     date_str = date.strftime("%Y-%m-%d")
     
-    markdown_content = template.render(
+    markdown_content = _TEMPLATE.render(
         papers=papers,
         date=date_str,
         count=len(papers)
@@ -83,7 +86,6 @@ def generate_report(papers, output_path, date=None):
     path.parent.mkdir(parents=True, exist_ok=True)
     
     # 3. Write File
-    with open(path, "w", encoding="utf-8") as f:
-        f.write(markdown_content)
+    path.write_text(markdown_content, encoding="utf-8")
     
     return str(path.absolute())
\ No newline at end of file
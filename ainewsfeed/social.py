@@ -1,16 +1,36 @@
-import requests
+import orjson
 
-def find_tweets_for_paper(paper_title, bearer_token):
+from ._http import SESSION
+
+# Standard endpoint (api.twitter.com is still the canonical base for v2)
+SEARCH_URL = "https://api.twitter.com/2/tweets/search/recent"
+
+def find_tweets_for_paper(paper_title, bearer_token, session=None):
     """
     Searches X (Twitter) API v2 using direct HTTP requests.
+    `session` defaults to the shared keep-alive session.
     """
     if not bearer_token:
         print("⚠️ No X Bearer Token provided.")
         return []
 
-    # Standard endpoint (api.twitter.com is still the canonical base for v2)
-    url = "https://api.twitter.com/2/tweets/search/recent"
-    
+    headers, params, clean_title = _build_search(paper_title, bearer_token)
+
+    try:
+        response = (session or SESSION).get(SEARCH_URL, headers=headers, params=params)
+        
+        if response.status_code != 200:
+            print(f"❌ X API Error ({response.status_code}): {response.text}")
+            return []
+            
+        return _parse_tweets(orjson.loads(response.content))
+
+    except Exception as e:
+        print(f"❌ Request Error for '{clean_title[:20]}...': {e}")
+        return []
+
+def _build_search(paper_title, bearer_token):
+    """Returns (headers, params, clean_title) for a recent-search request."""
     headers = {
         "Authorization": f"Bearer {bearer_token}",
         "User-Agent": "v2RecentSearchPython"
@@ -29,51 +49,41 @@ def find_tweets_for_paper(paper_title, bearer_token):
         "expansions": "author_id",
         "user.fields": "name,username"
     }
+    return headers, params, clean_title
 
-    try:
-        response = requests.get(url, headers=headers, params=params)
+def _parse_tweets(data):
+    """Turns a recent-search response body into tweet dicts, most liked first."""
+    if "data" not in data:
+        return []
+
+    # 3. Build User Lookup (Map author_id -> User Object)
+    users = {}
+    if "includes" in data and "users" in data["includes"]:
+        for user in data["includes"]["users"]:
+            users[user["id"]] = user
+    
+    results = []
+    for tweet in data["data"]:
+        metrics = tweet.get("public_metrics", {})
+        likes = metrics.get("like_count", 0)
         
-        if response.status_code != 200:
-            print(f"❌ X API Error ({response.status_code}): {response.text}")
-            return []
-            
-        data = response.json()
+        # Filter noise (tweets with 0-1 likes)
+        if likes < 2:
+            continue
         
-        if "data" not in data:
-            return []
-
-        # 3. Build User Lookup (Map author_id -> User Object)
-        users = {}
-        if "includes" in data and "users" in data["includes"]:
-            for user in data["includes"]["users"]:
-                users[user["id"]] = user
+        author_id = tweet.get("author_id")
+        author = users.get(author_id, {})
+        handle = author.get("username", "unknown")
         
-        results = []
-        for tweet in data["data"]:
-            metrics = tweet.get("public_metrics", {})
-            likes = metrics.get("like_count", 0)
-            
-            # Filter noise (tweets with 0-1 likes)
-            if likes < 2:
-                continue
-            
-            author_id = tweet.get("author_id")
-            author = users.get(author_id, {})
-            handle = author.get("username", "unknown")
-            
-            results.append({
-                "text": tweet.get("text", ""),
-                "author_name": author.get("name", "Unknown"),
-                "author_handle": handle,
-                "likes": likes,
-                "retweets": metrics.get("retweet_count", 0),
-                "url": f"https://x.com/{handle}/status/{tweet.get('id')}"
-            })
-            
-        # Sort by likes descending
-        results.sort(key=lambda x: x['likes'], reverse=True)
-        return results
-
-    except Exception as e:
-        print(f"❌ Request Error for '{clean_title[:20]}...': {e}")
-        return []
\ No newline at end of file
+        results.append({
+            "text": tweet.get("text", ""),
+            "author_name": author.get("name", "Unknown"),
+            "author_handle": handle,
+            "likes": likes,
+            "retweets": metrics.get("retweet_count", 0),
+            "url": f"https://x.com/{handle}/status/{tweet.get('id')}"
+        })
+        
+    # Sort by likes descending
+    results.sort(key=lambda x: x['likes'], reverse=True)
+    return results
@@ -0,0 +1,68 @@
+import asyncio
+from contextlib import nullcontext
+import httpx
+import orjson
+
+from .social import SEARCH_URL, _build_search, _parse_tweets
+
+class _RateLimiter:
+    """Spaces request starts at least 1/rps seconds apart."""
+
+    def __init__(self, rps):
+        self.interval = 1 / rps
+        self.lock = asyncio.Lock()
+        self.next_slot = 0.0
+
+    async def wait(self):
+        async with self.lock:
+            now = asyncio.get_running_loop().time()
+            delay = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+async def find_tweets_for_paper_async(client, paper_title, bearer_token, semaphore=None, limiter=None):
+    """
+    Async twin of social.find_tweets_for_paper, returning the same shape.
+    Pass a shared `semaphore` / `limiter` to bound concurrency and request rate.
+    """
+    headers, params, clean_title = _build_search(paper_title, bearer_token)
+
+    async with semaphore or nullcontext():
+        try:
+            if limiter is not None:
+                await limiter.wait()
+            response = await client.get(SEARCH_URL, headers=headers, params=params)
+
+            if response.status_code != 200:
+                print(f"❌ X API Error ({response.status_code}): {response.text}")
+                return []
+
+            return _parse_tweets(orjson.loads(response.content))
+
+        except Exception as e:
+            print(f"❌ Request Error for '{clean_title[:20]}...': {e}")
+            return []
+
+async def find_tweets_for_papers_async(paper_titles, bearer_token, concurrency=8, rps=1):
+    """Awaitable version of find_tweets_for_papers for callers already in an event loop."""
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = _RateLimiter(rps)
+    limits = httpx.Limits(max_connections=16)
+    async with httpx.AsyncClient(http2=True, timeout=10, limits=limits) as client:
+        return await asyncio.gather(*(
+            find_tweets_for_paper_async(client, title, bearer_token, semaphore, limiter)
+            for title in paper_titles
+        ))
+
+def find_tweets_for_papers(paper_titles, bearer_token, concurrency=8, rps=1):
+    """
+    Searches X for many papers concurrently.
+    Requests overlap on one HTTP/2 connection but start at most `rps` per second.
+    Returns a list of tweet lists in the same order as `paper_titles`.
+    """
+    if not bearer_token:
+        print("⚠️ No X Bearer Token provided.")
+        return [[] for _ in paper_titles]
+
+    return asyncio.run(find_tweets_for_papers_async(paper_titles, bearer_token, concurrency, rps))
@@ -0,0 +1,71 @@
+from functools import lru_cache
+
+try:
+    # Optional: google-re2 matches in linear time without backtracking
+    import re2 as re
+except ImportError:
+    import re
+
+# Regex to capture http/https URLs. RE2 has no lookbehind, so trailing dots
+# (end of sentence) are stripped from each match instead, see _find_urls.
+_URL_RE = re.compile(r'https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+[/\w\.-]*')
+# Academic/meta links that are never project pages
+_EXCLUDES = frozenset(("arxiv.org", "doi.org", "creativecommons.org", "license", "overleaf.com"))
+
+@lru_cache(maxsize=4096)
+def extract_project_url(text):
+    """
+    Finds the first valid external project URL (Web Demos, YouTube).
+    Ignores:
+      - ArXiv / DOI / Academic links
+      - github.com (Repositories do not iframe well)
+    Keeps:
+      - github.io (Project Pages)
+      - huggingface.co (Spaces)
+      - Custom domains
+    """
+    if not text or "http" not in text: return None
+    
+    for url in _find_urls(text):
+        lower_url = url.lower()
+        
+        # 1. Exclude academic/meta links
+        if any(x in lower_url for x in _EXCLUDES):
+            continue
+            
+        # 2. Exclude raw GitHub repositories (they block iframes)
+        # But keep *.github.io (Project Pages)
+        if "github.com" in lower_url:
+            continue
+            
+        # 3. Handle Video Embeds (YouTube)
+        if "youtube.com/watch" in url:
+            video_id = url.split("v=")[-1].split("&")[0]
+            return f"https://www.youtube.com/embed/{video_id}"
+        if "youtu.be" in url:
+            video_id = url.split("/")[-1]
+            return f"https://www.youtube.com/embed/{video_id}"
+            
+        return url # Return the first valid one found
+        
+    return None
+
+def _find_urls(text):
+    """Yields the URLs in `text`, without trailing dots."""
+    for url in _URL_RE.findall(text):
+        url = url.rstrip('.')
+        # Only dots after the scheme (e.g. "https://..."): no host, not a URL
+        if not url.endswith('://'):
+            yield url
+
+def has_project_link(paper):
+    """
+    Returns True if the paper has a project link in Abstract OR Comments.
+    """
+    # Check Abstract
+    if extract_project_url(paper.get('abstract', '')):
+        return True
+    # Check Comment (e.g. "Code at https://github...")
+    if extract_project_url(paper.get('comment', '')):
+        return True
+    return False
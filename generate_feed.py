@@ -1,70 +1,61 @@
-import os
 import sys
-import yaml
-import json
+import orjson
 import datetime
 from datetime import timezone
 import argparse
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from dotenv import load_dotenv
 
 import ainewsfeed
+from ainewsfeed.cache import set_refresh
+from ainewsfeed.cli import load_config, setup_directories
 
-def load_config(config_path):
-    """Loads YAML config and overrides with Env Vars."""
-    if not os.path.exists(config_path):
-        print(f"❌ Config file not found: {config_path}")
-        sys.exit(1)
+def write_data_file(data_file, papers):
+    """Writes the papers_data.json cache."""
+    with open(data_file, "wb") as f:
+        f.write(orjson.dumps(papers, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
 
-    with open(config_path, "r") as f:
-        config = yaml.safe_load(f)
-
-    load_dotenv()
-    
-    # Priority: Env Var > YAML
-    config["keys"] = {}
-    config['keys']['gemini'] = os.getenv("GEMINI_API_KEY") or config['keys'].get('gemini')
-    config['keys']['x_bearer'] = os.getenv("X_BEARER_TOKEN") or config['keys'].get('x_bearer')
-
-    if not config['keys']['gemini']:
-        print("❌ Error: Gemini API Key is missing.")
-        sys.exit(1)
-        
-    return config
-
-def setup_directories(root_dir, filename_prefix, date=None):
+def lookup_affiliations(paper_ids):
     """
-    Sets up the directory structure and returns paths.
+    Returns {paper_id: author string with affiliations} from Semantic Scholar,
+    scraping arXiv only for papers Semantic Scholar has no affiliations for.
     """
-    now = datetime.datetime.now() if date is None else date
-    year = now.strftime("%Y")
-    week = now.strftime("%V")
-    date_str = now.strftime("%Y_%m_%d")
-    
-    # 1. Base Week Directory
-    week_dir = Path(root_dir) / year / f"week_{week}"
-    week_dir.mkdir(parents=True, exist_ok=True)
-    
-    # 2. Assets Directory
-    assets_folder_name = f"{filename_prefix}_{date_str}"
-    assets_dir = week_dir / "assets" / assets_folder_name
-    assets_dir.mkdir(parents=True, exist_ok=True)
-    
-    # 3. File Paths
-    report_file = week_dir / f"{filename_prefix}_{date_str}.md"
-    data_file = assets_dir / "papers_data.json"  # <-- Cache File
-    relative_asset_path = f"./assets/{assets_folder_name}"
+    affiliations = ainewsfeed.get_author_affiliations_batch(paper_ids)
+    missing = [pid for pid in paper_ids if pid not in affiliations]
+    if missing:
+        affiliations.update(ainewsfeed.get_author_affiliations_bulk(missing))
+    return affiliations
 
-    return report_file, assets_dir, data_file, relative_asset_path
+def load_journal(journal_file):
+    """
+    Reads the append-only progress journal of an interrupted run.
+    Returns {paper_id: paper} for every paper that finished its asset stage.
+    """
+    completed = {}
+    if not journal_file.exists():
+        return completed
+
+    with open(journal_file, "rb") as f:
+        for line in f:
+            try:
+                paper = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                continue  # Torn last line from a crash
+            completed[paper['id']] = paper
+    return completed
 
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--config", default="config.yaml")
-    parser.add_argument("--force", action="store_true", help="Ignore cache and regenerate")
+    parser.add_argument("--force", action="store_true", help="Ignore all caches and regenerate")
     parser.add_argument("--date", type=str, help="Use specific date for report (YYYY-MM-DD)")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="Max parallel arXiv API requests")
     args = parser.parse_args()
 
     cfg = load_config(args.config)
+    if args.force:
+        # Bypass the persistent arXiv / affiliation caches too, not just papers_data.json
+        set_refresh()
 
     # Determine Date Range
     if args.date:
@@ -89,13 +80,14 @@ def main():
     )
 
     enriched = []
+    save_cache = False
 
     # --- 2. Check Cache ---
     if data_file.exists() and not args.force:
         print(f"⚡ Found cached data at: {data_file}")
         print("   Skipping API calls and downloads...")
-        with open(data_file, "r") as f:
-            enriched = json.load(f)
+        with open(data_file, "rb") as f:
+            enriched = orjson.loads(f.read())
             
     else:
         # --- 3. Run Full Pipeline (If no cache) ---
@@ -107,7 +99,8 @@ def main():
             start_date=start_date,
             end_date=report_date,
             max_results=cfg['research']['max_raw_papers'],
-            categories=cfg['research']['categories']
+            categories=cfg['research']['categories'],
+            max_concurrency=args.max_concurrency
         )
 
         if not raw_papers:
@@ -128,7 +121,10 @@ def main():
             raw_papers, 
             cfg['interests'], 
             api_key=cfg['keys']['gemini'], 
-            limit=cfg['research']['max_selected_papers']
+            limit=cfg['research']['max_selected_papers'],
+            concurrency=cfg['research'].get('gemini_concurrency', 8),
+            shard_size=cfg['research'].get('filter_shard', 50),
+            cache_path=None if args.force else Path(cfg['output']['root_dir']) / '.gemini_cache.sqlite'
         )
         enriched = filter_result["papers"]
 
@@ -140,56 +136,113 @@ def main():
             print(f"      - {paper['star_rating']} {paper['title']}: {paper['ai_summary']}")
         
         # D. Download Assets
-        print(f"   Downloading assets to {assets_dir}...")
-        for i, paper in enumerate(enriched):
-            print(f"   [{i+1}/{len(enriched)}] Processing: {paper['id']}")
-            
-            # Affiliations
-            affiliations = ainewsfeed.fetch.get_author_affiliations(paper['id'])
-            paper['authors_full'] = affiliations if affiliations else ", ".join(paper.get('authors', []))
-
-            # PDF Download
-            pdf_url = paper.get('pdf_url') or paper['url'].replace('/abs/', '/pdf/') + ".pdf"
-            pdf_filename = f"{paper['id']}.pdf"
-            save_pdf_path = assets_dir / pdf_filename
-            
-            success = ainewsfeed.assets.download_pdf(pdf_url, save_pdf_path)
-            
-            if success:
-                # Store RELATIVE path for Markdown
-                paper['local_pdf'] = f"{rel_asset_path}/{pdf_filename}"
-                
-                # Generate Preview
-                preview_filename = ainewsfeed.assets.generate_pdf_preview(
-                    save_pdf_path, 
-                    paper['id'],    # Pass ID
-                    assets_dir      # Pass Directory
-                )
-                
-                # Check for preview
-                if (assets_dir / preview_filename).exists():
-                    paper['pdf_preview'] = f"{rel_asset_path}/{preview_filename}"
+        # Resume: papers finished by an interrupted run are journaled one per line
+        journal_file = data_file.with_suffix('.jsonl')
+        if args.force:
+            journal_file.unlink(missing_ok=True)
+        completed = load_journal(journal_file)
+        todo = []
+        for paper in enriched:
+            if paper['id'] in completed:
+                paper.update(completed[paper['id']])
+            else:
+                todo.append(paper)
+        if completed:
+            print(f"   Resuming: {len(enriched) - len(todo)} papers already processed.")
+
+        # Affiliation lookups run in the background, overlapping the downloads and previews
+        with open(journal_file, "ab") as journal, ThreadPoolExecutor(max_workers=1) as lookup:
+            print(f"   Fetching affiliations for {len(todo)} papers...")
+            paper_ids = [paper['id'] for paper in todo]
+            affiliations_future = lookup.submit(lookup_affiliations, paper_ids)
+
+            def set_authors(paper):
+                # Blocks only until the background lookup has finished
+                affiliations = affiliations_future.result()
+                paper['authors_full'] = affiliations.get(paper['id']) or ", ".join(paper.get('authors_simple', []))
+
+            def mark_done(paper):
+                set_authors(paper)
+                journal.write(orjson.dumps(paper) + b"\n")
+                journal.flush()
+
+            pdf_urls = [
+                paper.get('pdf_url') or paper['url'].replace('/abs/', '/pdf/') + ".pdf"
+                for paper in todo
+            ]
+            pdf_filenames = [f"{paper['id']}.pdf" for paper in todo]
+
+            if not cfg['output'].get('download_pdfs', True):
+                # Metadata-only digest: link the remote PDFs, skip download and previews
+                for paper, pdf_url in zip(todo, pdf_urls):
+                    paper['local_pdf'] = pdf_url
+                    mark_done(paper)
             else:
-                paper['local_pdf'] = pdf_url
+                print(f"   Downloading assets to {assets_dir}...")
+
+                # Large runs can pull PDFs from arXiv's S3 bulk tarballs instead of
+                # rate-limited HTTPS; anything found there is skipped by the HTTPS pass
+                if cfg['research'].get('use_s3_bulk', False) and len(todo) >= cfg['research'].get('s3_min_papers', 100):
+                    print("   Fetching PDFs from the arXiv S3 bulk bucket...")
+                    ainewsfeed.download_pdfs_s3(paper_ids, assets_dir)
+
+                # Downloads (threads) and preview rendering (processes) overlap
+                jobs = [
+                    (url, assets_dir / name, paper['id'])
+                    for url, name, paper in zip(pdf_urls, pdf_filenames, todo)
+                ]
+                for i, success, preview_filename, _ in ainewsfeed.iter_pdf_assets(
+                    jobs,
+                    assets_dir,
+                    max_workers=cfg['research'].get('download_workers', 16),
+                    max_figures=0  # The report only shows the first-page preview
+                ):
+                    paper = todo[i]
+                    if success:
+                        # Store RELATIVE path for Markdown
+                        paper['local_pdf'] = f"{rel_asset_path}/{pdf_filenames[i]}"
+                    
+                        # Check for preview
+                        if preview_filename and (assets_dir / preview_filename).exists():
+                            paper['pdf_preview'] = f"{rel_asset_path}/{preview_filename}"
+                            mark_done(paper)
+                        else:
+                            # Not journaled, so a re-run retries the render (the PDF is kept)
+                            set_authors(paper)
+                    else:
+                        # Not journaled, so a re-run retries the download
+                        paper['local_pdf'] = pdf_urls[i]
+                        set_authors(paper)
 
         # E. Social Signal
         if cfg['keys'].get('x_bearer'):
             print("   Scanning X for discussions...")
-            for paper in enriched:
-                paper['tweets'] = ainewsfeed.find_tweets_for_paper(
-                    paper['title'], 
-                    cfg['keys']['x_bearer']
-                )
+            tweets = ainewsfeed.find_tweets_for_papers(
+                [paper['title'] for paper in enriched],
+                cfg['keys']['x_bearer'],
+                rps=cfg.get('x', {}).get('rps', 1)
+            )
+            for paper, paper_tweets in zip(enriched, tweets):
+                paper['tweets'] = paper_tweets
 
-        # --- 4. Save Cache ---
-        print(f"💾 Saving data cache to: {data_file}")
-        with open(data_file, "w") as f:
-            json.dump(enriched, f, indent=2)
+        # --- 4. Save Cache (written below, alongside the report) ---
+        save_cache = True
 
     # --- 5. Generate Report ---
-    print("📝 Generating Markdown report...")
-    final_path = ainewsfeed.generate_report(enriched, report_path, date=report_date)
-    print(f"🚀 Report saved to: {final_path}")
+    # The cache write is pure I/O, so it runs in a background thread while the report renders
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        if save_cache:
+            print(f"💾 Saving data cache to: {data_file}")
+            save_future = executor.submit(write_data_file, data_file, enriched)
+
+        print("📝 Generating Markdown report...")
+        final_path = ainewsfeed.generate_report(enriched, report_path, date=report_date)
+        print(f"🚀 Report saved to: {final_path}")
+
+        if save_cache:
+            save_future.result()
+            # Only drop the journal once the full cache is safely on disk
+            journal_file.unlink(missing_ok=True)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file